@@ -1,45 +1,8 @@
 import streamlit as st
-import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 
-class SimpleRAG:
-    def __init__(self):
-        """Initialize the RAG system with sentence transformer"""
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.documents = []
-        self.embeddings = None
-        
-    def add_documents(self, documents: list[str]) -> None:
-        """Add documents and compute their embeddings"""
-        self.documents = documents
-        if documents:
-            self.embeddings = self.model.encode(documents)
-        else:
-            self.embeddings = None
-            
-    def query(self, question: str, n_results: int = 3) -> list[tuple[str, float]]:
-        """Query documents and return results with scores"""
-        if not self.documents or not self.embeddings:
-            return []
-        
-        # Get question embedding
-        q_embedding = self.model.encode([question])
-        
-        # Calculate similarities
-        similarities = cosine_similarity(q_embedding, self.embeddings)[0]
-        
-        # Get top results
-        n_results = min(n_results, len(self.documents))
-        top_indices = similarities.argsort()[-n_results:][::-1]
-        
-        # Return documents and scores
-        results = [
-            (self.documents[i], float(similarities[i]))
-            for i in top_indices
-        ]
-        
-        return results
+import chunking
+from rag import SAMPLE_DOCS, SimpleRAG, load_embedder, load_sample_embeddings
 
 # Set page config
 st.set_page_config(
@@ -48,13 +11,23 @@ st.set_page_config(
     layout="wide"
 )
 
+# Load the embedding model once and share it across pages and sessions
+@st.cache_resource
+def get_embedder() -> SentenceTransformer:
+    return load_embedder()
+
 # Initialize RAG system
 @st.cache_resource
 def get_rag():
-    return SimpleRAG()
+    return SimpleRAG(model=get_embedder())
 
 rag = get_rag()
 
+@st.cache_data(max_entries=8, ttl=3600)
+def split_documents(text: str) -> list[str]:
+    """Split raw input into documents, cached across reruns"""
+    return chunking.split_documents(text)
+
 # Title
 st.title("📚 Simple RAG System")
 
@@ -75,7 +48,7 @@ with left_col:
         if st.button("Process Documents", use_container_width=True):
             if doc_input.strip():
                 with st.spinner("Processing..."):
-                    docs = [d.strip() for d in doc_input.split('\n\n') if d.strip()]
+                    docs = split_documents(doc_input)
                     rag.add_documents(docs)
                     st.success("✅ Documents processed!")
             else:
@@ -83,13 +56,7 @@ with left_col:
                 
     with col2:
         if st.button("Load Sample Data", use_container_width=True):
-            sample_docs = [
-                "Python is a high-level programming language known for its simplicity and readability. It was created by Guido van Rossum and released in 1991.",
-                "Python supports multiple programming paradigms, including procedural, object-oriented, and functional programming.",
-                "Python is widely used in data science, machine learning, web development, and automation.",
-                "Python's package manager pip makes it easy to install and manage third-party packages."
-            ]
-            rag.add_documents(sample_docs)
+            rag.add_documents(SAMPLE_DOCS, precomputed=load_sample_embeddings(rag.model))
             st.success("✅ Sample data loaded!")
 
 with right_col:
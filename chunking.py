@@ -0,0 +1,54 @@
+import re
+
+# Paragraphs longer than CHUNK_SIZE characters are packed into overlapping windows
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+SENT_RE = re.compile(r'(?<=[.!?])\s+')
+WHITESPACE_RE = re.compile(r'\s')
+
+def _cut_sentence(sentence: str, max_len: int) -> list[str]:
+    """Cut a sentence into pieces of at most max_len characters, preferring whitespace"""
+    pieces = []
+    while len(sentence) > max_len:
+        # Cut before the last whitespace that fits; the next piece starts with it
+        cut = max(
+            (m.start() for m in WHITESPACE_RE.finditer(sentence, 1, max_len + 1)),
+            default=max_len
+        )
+        pieces.append(sentence[:cut])
+        sentence = sentence[cut:]
+    pieces.append(sentence)
+    return pieces
+
+def pack_sentences(paragraph: str) -> list[str]:
+    """Greedily pack sentences into windows of at most CHUNK_SIZE characters"""
+    # Every piece must fit after a carried-over overlap and a joining space
+    max_piece = CHUNK_SIZE - CHUNK_OVERLAP - 1
+    # Sentences are joined with a space; pieces of a cut sentence are rejoined as-is
+    pieces = []
+    for sentence in SENT_RE.split(paragraph):
+        for i, piece in enumerate(_cut_sentence(sentence, max_piece)):
+            pieces.append(("" if i else " ", piece))
+    
+    windows = []
+    current = ""
+    for sep, piece in pieces:
+        if current and len(current) + len(sep) + len(piece) > CHUNK_SIZE:
+            windows.append(current.strip())
+            # Start the next window with the tail of this one, on a word boundary
+            current = current[-CHUNK_OVERLAP:].split(' ', 1)[-1]
+        current = current + sep + piece if current else piece
+    if current.strip():
+        windows.append(current.strip())
+    return windows
+
+def split_documents(text: str) -> list[str]:
+    """Split raw input into documents on blank lines, packing long paragraphs"""
+    chunks = []
+    for paragraph in text.split('\n\n'):
+        paragraph = paragraph.strip()
+        if len(paragraph) > CHUNK_SIZE:
+            chunks += pack_sentences(paragraph)
+        elif paragraph:
+            chunks.append(paragraph)
+    return chunks
@@ -0,0 +1,29 @@
+"""Precompute the sample-data embeddings so "Load Sample Data" never encodes at runtime.
+
+Run once at image build time, on the same kind of device the app will serve from:
+
+    python precompute.py
+"""
+import numpy as np
+
+from rag import SAMPLE_DOCS, SAMPLE_EMBEDDINGS_PATH, content_key, embedder_tag, load_embedder
+
+def main() -> None:
+    model = load_embedder()
+    embeddings = model.encode(
+        SAMPLE_DOCS,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+    # Keys and tag let the app reject rows for edited docs or a different model
+    np.savez(
+        SAMPLE_EMBEDDINGS_PATH,
+        tag=np.array(embedder_tag(model)),
+        keys=np.array([content_key(doc) for doc in SAMPLE_DOCS]),
+        embeddings=np.ascontiguousarray(embeddings, dtype=np.float32)
+    )
+    print(f"Wrote {len(SAMPLE_DOCS)} sample embeddings to {SAMPLE_EMBEDDINGS_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import zipfile
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+def _available_cpus() -> int:
+    """Return the CPUs this process may run on, honouring its affinity mask"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+# Match intra-op threads to the CPUs actually assigned to this process rather than
+# every logical CPU on the host
+torch.set_num_threads(_available_cpus())
+try:
+    torch.set_num_interop_threads(2)
+except RuntimeError:
+    # Streamlit may reload this module; torch only allows setting this once
+    pass
+
+# On multi-GPU hosts, ingests larger than this are split with one encoder process per GPU.
+# CPU-only hosts stay single-process: one encode already uses every core, and extra
+# workers would each load a model copy and oversubscribe the CPU
+MULTI_PROCESS_THRESHOLD = 2000
+
+# Embeddings are persisted under here, one subdirectory per model and precision,
+# so restarts don't re-encode known documents
+EMB_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "emb_cache")
+
+# Past this many entries the least recently used half is dropped and the cache compacted
+MAX_CACHE_ENTRIES = 100_000
+# Past this many segment files they are merged into one, keeping startup loads cheap
+MAX_CACHE_SEGMENTS = 32
+
+SAMPLE_DOCS = [
+    "Python is a high-level programming language known for its simplicity and readability. It was created by Guido van Rossum and released in 1991.",
+    "Python supports multiple programming paradigms, including procedural, object-oriented, and functional programming.",
+    "Python is widely used in data science, machine learning, web development, and automation.",
+    "Python's package manager pip makes it easy to install and manage third-party packages."
+]
+
+# Written at build time by precompute.py
+SAMPLE_EMBEDDINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample.npz")
+
+def load_embedder() -> SentenceTransformer:
+    """Load the sentence transformer, tuned for the device it will run on"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    # Move eagerly so model.device is accurate before the first encode
+    model = SentenceTransformer(MODEL_NAME, device=device).to(device)
+    if device == "cuda":
+        # Half-precision weights halve weight-fetch bandwidth on GPU
+        model.half()
+    else:
+        # int8 weights for the attention/FFN projections; encode is GEMM-bound on CPU
+        torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    return model
+
+def load_sample_embeddings(model: SentenceTransformer) -> dict[str, np.ndarray]:
+    """Load precomputed sample embeddings that still match SAMPLE_DOCS and the model"""
+    try:
+        with np.load(SAMPLE_EMBEDDINGS_PATH) as data:
+            tag = str(data["tag"])
+            keys = data["keys"].tolist()
+            embeddings = data["embeddings"]
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        return {}
+    dim = model.get_sentence_embedding_dimension()
+    if tag != embedder_tag(model) or embeddings.shape != (len(keys), dim):
+        return {}
+    
+    # Rows for edited or removed sample docs are dropped; those docs get encoded
+    wanted = {content_key(doc) for doc in SAMPLE_DOCS}
+    return {key: row for key, row in zip(keys, embeddings) if key in wanted}
+
+def embedder_tag(model: SentenceTransformer) -> str:
+    """Identify the model and precision load_embedder produced for a device"""
+    precision = "fp16" if model.device.type == "cuda" else "int8"
+    return f"{MODEL_NAME.replace('/', '_')}-{precision}"
+
+def content_key(text: str) -> str:
+    """Return a short content hash used to key cached embeddings"""
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+class SimpleRAG:
+    def __init__(self, model: SentenceTransformer):
+        """Initialize the RAG system with a shared sentence transformer"""
+        self.model = model
+        # (documents, host embeddings, device embeddings) published in one assignment, so
+        # concurrent queries always read a consistent snapshot. The device copy is only
+        # built when the model is on GPU
+        self._index: tuple[list[str], np.ndarray, torch.Tensor | None] | None = None
+        self._dim = model.get_sentence_embedding_dimension()
+        self._cache_dir = os.path.join(EMB_CACHE_DIR, embedder_tag(model))
+        self._segments: list[str] = []
+        # One instance is shared by every Streamlit session
+        self._lock = threading.Lock()
+        self._emb_cache: dict[str, np.ndarray] = self._load_cache()
+        
+    @property
+    def documents(self) -> list[str]:
+        """Documents currently being searched"""
+        index = self._index
+        return index[0] if index is not None else []
+        
+    @property
+    def embeddings(self) -> np.ndarray | None:
+        """Normalised embeddings of the current documents, one row each"""
+        index = self._index
+        return index[1] if index is not None else None
+        
+    def add_documents(
+        self, documents: list[str], precomputed: dict[str, np.ndarray] | None = None
+    ) -> None:
+        """Add documents and compute their embeddings, reusing cached or precomputed ones"""
+        with self._lock:
+            if not documents:
+                self._index = None
+                return
+            
+            keys = [content_key(doc) for doc in documents]
+            if precomputed:
+                # Never replace an embedding the cache already holds
+                for key in keys:
+                    if key in precomputed:
+                        self._emb_cache.setdefault(key, precomputed[key])
+            
+            # Only encode documents we haven't seen before; mark hits as recently used
+            missing = {}
+            for key, doc in zip(keys, documents):
+                if key in self._emb_cache:
+                    self._emb_cache[key] = self._emb_cache.pop(key)
+                else:
+                    missing[key] = doc
+            if missing:
+                texts = list(missing.values())
+                if len(texts) > MULTI_PROCESS_THRESHOLD and torch.cuda.device_count() > 1:
+                    embeddings = self._encode_multi_process(texts)
+                else:
+                    embeddings = self.model.encode(
+                        texts,
+                        batch_size=64,
+                        show_progress_bar=False,
+                        convert_to_numpy=True,
+                        normalize_embeddings=True
+                    )
+                self._emb_cache.update(zip(missing.keys(), embeddings))
+            
+            # Rows are unit length, so cosine similarity is a plain dot product
+            host_embeddings = np.ascontiguousarray(
+                np.stack([self._emb_cache[key] for key in keys]), dtype=np.float32
+            )
+            device_embeddings = None
+            if self.model.device.type == "cuda":
+                # Upload once from pinned memory as FP16, halving the bandwidth each
+                # query's matmul reads; queries then stay on the GPU
+                device_embeddings = torch.from_numpy(host_embeddings).pin_memory().to(
+                    self.model.device, dtype=torch.float16, non_blocking=True
+                )
+            self._index = (documents, host_embeddings, device_embeddings)
+            
+            if (
+                len(self._emb_cache) > MAX_CACHE_ENTRIES
+                or (missing and len(self._segments) >= MAX_CACHE_SEGMENTS)
+            ):
+                self._compact_cache(keep=set(keys))
+            elif missing:
+                self._save_segment(list(missing.keys()))
+            
+    def _encode_multi_process(self, texts: list[str]) -> np.ndarray:
+        """Encode a large batch with one worker process per GPU"""
+        pool = self.model.start_multi_process_pool(
+            target_devices=[f"cuda:{i}" for i in range(torch.cuda.device_count())]
+        )
+        try:
+            embeddings = self.model.encode_multi_process(texts, pool, batch_size=32)
+        finally:
+            self.model.stop_multi_process_pool(pool)
+        
+        # encode_multi_process has no normalize option; normalise in FP32 so FP16 rows
+        # from GPU workers don't lose precision
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings
+        
+    def _load_cache(self) -> dict[str, np.ndarray]:
+        """Load this model's persisted embeddings, skipping unreadable or mismatched segments"""
+        cache = {}
+        # Segment names start with their creation time, so later writes win
+        for path in sorted(glob.glob(os.path.join(self._cache_dir, "*.npz"))):
+            try:
+                with np.load(path) as data:
+                    keys = data["keys"].tolist()
+                    embeddings = data["embeddings"]
+            except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+                continue
+            if embeddings.ndim != 2 or embeddings.shape != (len(keys), self._dim):
+                continue
+            cache.update(zip(keys, embeddings))
+            self._segments.append(path)
+        return cache
+        
+    def _save_segment(self, keys: list[str]) -> bool:
+        """Write the given cache entries to a new segment file; return whether it succeeded"""
+        tmp_path = None
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self._cache_dir, prefix=f"{time.time_ns():020d}-", suffix=".tmp"
+            )
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    keys=np.array(keys),
+                    embeddings=np.stack([self._emb_cache[key] for key in keys])
+                )
+            path = tmp_path.removesuffix(".tmp") + ".npz"
+            os.replace(tmp_path, path)
+        except OSError:
+            # Persistence is best effort; the in-memory cache is still valid
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        self._segments.append(path)
+        return True
+        
+    def _compact_cache(self, keep: set[str]) -> None:
+        """Rewrite the cache as one segment, first evicting LRU entries if it is over size"""
+        if len(self._emb_cache) > MAX_CACHE_ENTRIES:
+            # Shrink to half the limit, but never evict the keys the caller just used
+            excess = len(self._emb_cache) - MAX_CACHE_ENTRIES // 2
+            evict = [key for key in self._emb_cache if key not in keep][:excess]
+            for key in evict:
+                del self._emb_cache[key]
+        
+        old_segments, self._segments = self._segments, []
+        if not self._save_segment(list(self._emb_cache)):
+            self._segments = old_segments
+            return
+        for path in old_segments:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            
+    def query(self, question: str, n_results: int = 3) -> list[tuple[str, float]]:
+        """Query documents and return results with scores"""
+        # Read the snapshot once; add_documents may publish a new one meanwhile
+        index = self._index
+        if index is None:
+            return []
+        documents, host_embeddings, device_embeddings = index
+        
+        # Get top results
+        n_results = min(n_results, len(documents))
+        if device_embeddings is not None:
+            scores, top_indices = self._search_device(device_embeddings, question, n_results)
+        else:
+            scores, top_indices = self._search_host(host_embeddings, question, n_results)
+        
+        # Return documents and scores
+        results = [
+            (documents[i], float(score))
+            for i, score in zip(top_indices, scores)
+        ]
+        
+        return results
+        
+    def _search_host(
+        self, embeddings: np.ndarray, question: str, n_results: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return the top scores and their indices using NumPy"""
+        # Get question embedding
+        q_embedding = self.model.encode(
+            [question], convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32, copy=False)
+        
+        # Calculate similarities
+        similarities = embeddings @ q_embedding[0]
+        
+        # Partition around the k-th best score, then sort only those k
+        top_indices = np.argpartition(-similarities, n_results - 1)[:n_results]
+        top_indices = top_indices[np.argsort(-similarities[top_indices])]
+        return similarities[top_indices], top_indices
+        
+    def _search_device(
+        self, embeddings: torch.Tensor, question: str, n_results: int
+    ) -> tuple[list[float], list[int]]:
+        """Return the top scores and their indices without leaving the GPU"""
+        q_embedding = self.model.encode(
+            [question], convert_to_tensor=True, normalize_embeddings=True
+        )
+        similarities = embeddings @ q_embedding[0].to(embeddings.dtype)
+        
+        # Only the k winning scores and indices are copied back to the host
+        scores, top_indices = torch.topk(similarities, n_results)
+        return scores.tolist(), top_indices.tolist()
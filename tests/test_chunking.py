@@ -0,0 +1,60 @@
+import hashlib
+
+from chunking import CHUNK_SIZE, SENT_RE, pack_sentences, split_documents
+
+
+def _normalized(paragraph: str) -> str:
+    # pack_sentences joins sentences with a single space
+    return SENT_RE.sub(" ", paragraph)
+
+
+def test_short_paragraphs_are_kept_whole():
+    text = "First document.\n\nSecond document.\n\n\n\n"
+    assert split_documents(text) == ["First document.", "Second document."]
+
+
+def test_windows_fit_chunk_size():
+    paragraph = " ".join(f"Sentence number {i} is here." for i in range(200))
+    windows = pack_sentences(paragraph)
+    assert len(windows) > 1
+    assert all(0 < len(window) <= CHUNK_SIZE for window in windows)
+
+
+def test_windows_are_substrings_covering_every_sentence():
+    sentences = [f"Sentence number {i} is here." for i in range(200)]
+    paragraph = " ".join(sentences)
+    windows = pack_sentences(paragraph)
+    assert all(window in _normalized(paragraph) for window in windows)
+    assert all(any(s in window for window in windows) for s in sentences)
+
+
+def test_unbroken_token_is_not_altered():
+    # Non-repeating, so each window's overlap with the previous ones is unambiguous
+    token = "".join(hashlib.sha256(str(i).encode()).hexdigest() for i in range(40))
+    windows = pack_sentences(token)
+    assert len(windows) > 1
+    assert all(" " not in window for window in windows)
+    assert all(len(window) <= CHUNK_SIZE for window in windows)
+
+    # Strip each window's carried-over overlap and the token reassembles exactly
+    rebuilt = windows[0]
+    for window in windows[1:]:
+        overlap = max(n for n in range(len(window)) if rebuilt.endswith(window[:n]))
+        rebuilt += window[overlap:]
+    assert rebuilt == token
+
+
+def test_long_sentence_is_cut_at_whitespace():
+    paragraph = "https://example.com/" + "x" * 300 + " " + " ".join(["word"] * 150)
+    windows = pack_sentences(paragraph)
+    assert all(len(window) <= CHUNK_SIZE for window in windows)
+    assert all(window in paragraph for window in windows)
+    assert any(window.startswith("https://example.com/" + "x" * 300) for window in windows)
+
+
+def test_long_paragraphs_are_packed_by_split_documents():
+    long_paragraph = " ".join(["Lorem ipsum dolor sit amet."] * 40)
+    chunks = split_documents(f"Short one.\n\n{long_paragraph}")
+    assert chunks[0] == "Short one."
+    assert all(len(chunk) <= CHUNK_SIZE for chunk in chunks)
+    assert len(chunks) > 2
@@ -0,0 +1,202 @@
+import hashlib
+import os
+
+import numpy as np
+import pytest
+import torch
+
+import rag
+from rag import SimpleRAG
+
+
+class FakeEncoder:
+    """Stands in for SentenceTransformer; embeds each text deterministically from its hash"""
+    device = torch.device("cpu")
+    dim = 8
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        rows = [
+            np.frombuffer(hashlib.sha256(text.encode()).digest()[:self.dim], dtype=np.uint8)
+            for text in texts
+        ]
+        embeddings = np.array(rows, dtype=np.float32) + 1
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag, "EMB_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _segments(rag_system: SimpleRAG) -> list[str]:
+    return sorted(f for f in os.listdir(rag_system._cache_dir) if f.endswith(".npz"))
+
+
+def test_cache_hits_are_not_re_encoded():
+    model = FakeEncoder()
+    rag_system = SimpleRAG(model)
+    rag_system.add_documents(["a", "b", "a"])
+    rag_system.add_documents(["a", "b", "c"])
+    assert model.calls == [["a", "b"], ["c"]]
+    assert rag_system.documents == ["a", "b", "c"]
+    assert rag_system.embeddings.shape == (3, FakeEncoder.dim)
+
+
+def test_query_ranks_exact_match_first():
+    rag_system = SimpleRAG(FakeEncoder())
+    rag_system.add_documents(["alpha", "beta", "gamma"])
+    results = rag_system.query("beta", n_results=5)
+    assert len(results) == 3
+    assert results[0][0] == "beta"
+    assert results[0][1] == pytest.approx(1.0)
+    assert [score for _, score in results] == sorted((s for _, s in results), reverse=True)
+
+
+def test_empty_documents_clear_the_index():
+    rag_system = SimpleRAG(FakeEncoder())
+    rag_system.add_documents(["a"])
+    rag_system.add_documents([])
+    assert rag_system.query("a") == []
+    assert rag_system.embeddings is None
+
+
+def test_fresh_instance_reloads_from_disk():
+    SimpleRAG(FakeEncoder()).add_documents(["a", "b"])
+    model = FakeEncoder()
+    reloaded = SimpleRAG(model)
+    reloaded.add_documents(["b", "a"])
+    assert model.calls == []
+
+
+def test_unreadable_and_mis_shaped_segments_are_skipped():
+    rag_system = SimpleRAG(FakeEncoder())
+    rag_system.add_documents(["a"])
+    with open(os.path.join(rag_system._cache_dir, "0-corrupt.npz"), "w") as f:
+        f.write("not a zip file")
+    np.savez(
+        os.path.join(rag_system._cache_dir, "1-wrong-dim.npz"),
+        keys=np.array([rag.content_key("b")]),
+        embeddings=np.ones((1, FakeEncoder.dim + 1), dtype=np.float32)
+    )
+    model = FakeEncoder()
+    reloaded = SimpleRAG(model)
+    reloaded.add_documents(["a", "b"])
+    assert model.calls == [["b"]]
+
+
+def test_hits_move_to_the_recently_used_end():
+    rag_system = SimpleRAG(FakeEncoder())
+    rag_system.add_documents(["a", "b", "c"])
+    rag_system.add_documents(["a"])
+    assert list(rag_system._emb_cache) == [rag.content_key(doc) for doc in ["b", "c", "a"]]
+
+
+def test_compaction_halves_the_cache_into_one_segment(monkeypatch):
+    monkeypatch.setattr(rag, "MAX_CACHE_ENTRIES", 6)
+    rag_system = SimpleRAG(FakeEncoder())
+    rag_system.add_documents(["a", "b", "c", "d"])
+    rag_system.add_documents(["e", "f", "g"])
+    assert list(rag_system._emb_cache) == [rag.content_key(doc) for doc in ["e", "f", "g"]]
+    assert len(_segments(rag_system)) == 1
+
+    # The compacted segment alone restores the surviving entries
+    model = FakeEncoder()
+    SimpleRAG(model).add_documents(["e", "f", "g"])
+    assert model.calls == []
+
+
+def test_compaction_keeps_every_key_of_the_current_call(monkeypatch):
+    monkeypatch.setattr(rag, "MAX_CACHE_ENTRIES", 6)
+    rag_system = SimpleRAG(FakeEncoder())
+    rag_system.add_documents(list("abcde"))
+    rag_system.add_documents(list("fghij"))
+    assert set(rag_system._emb_cache) == {rag.content_key(doc) for doc in "fghij"}
+
+
+def test_segments_are_merged_past_the_segment_limit(monkeypatch):
+    monkeypatch.setattr(rag, "MAX_CACHE_SEGMENTS", 3)
+    rag_system = SimpleRAG(FakeEncoder())
+    for doc in "abc":
+        rag_system.add_documents([doc])
+    assert len(_segments(rag_system)) == 3
+    rag_system.add_documents(["d"])
+    assert len(_segments(rag_system)) == 1
+    assert len(rag_system._emb_cache) == 4
+
+
+def test_failed_writes_leave_no_files_and_keep_the_memory_cache(monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(rag.np, "savez", fail)
+    model = FakeEncoder()
+    rag_system = SimpleRAG(model)
+    rag_system.add_documents(["a"])
+    rag_system.add_documents(["a"])
+    assert model.calls == [["a"]]
+    assert os.listdir(rag_system._cache_dir) == []
+    assert rag_system.query("a")[0][0] == "a"
+
+
+class FakePoolEncoder(FakeEncoder):
+    """Records multi-process pool usage; encode_multi_process returns unnormalised FP16"""
+
+    def __init__(self, fail: bool = False):
+        super().__init__()
+        self.fail = fail
+        self.target_devices = None
+        self.stopped = False
+
+    def start_multi_process_pool(self, target_devices=None):
+        self.target_devices = target_devices
+        return object()
+
+    def encode_multi_process(self, texts, pool, batch_size=32):
+        if self.fail:
+            raise RuntimeError("worker died")
+        return (np.arange(len(texts) * self.dim, dtype=np.float16).reshape(-1, self.dim) + 1) * 3
+
+    def stop_multi_process_pool(self, pool):
+        self.stopped = True
+
+
+@pytest.fixture
+def two_gpus(monkeypatch):
+    monkeypatch.setattr(rag, "MULTI_PROCESS_THRESHOLD", 2)
+    monkeypatch.setattr(torch.cuda, "device_count", lambda: 2)
+
+
+def test_large_ingest_uses_one_worker_per_gpu(two_gpus):
+    model = FakePoolEncoder()
+    rag_system = SimpleRAG(model)
+    rag_system.add_documents(list("abc"))
+    assert model.calls == []
+    assert model.target_devices == ["cuda:0", "cuda:1"]
+    assert model.stopped
+    assert rag_system.embeddings.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(rag_system.embeddings, axis=1), 1, rtol=1e-6)
+
+
+def test_pool_is_stopped_when_encoding_fails(two_gpus):
+    model = FakePoolEncoder(fail=True)
+    rag_system = SimpleRAG(model)
+    with pytest.raises(RuntimeError, match="worker died"):
+        rag_system.add_documents(list("abc"))
+    assert model.stopped
+    assert rag_system.embeddings is None
+
+
+def test_small_ingest_and_single_gpu_stay_single_process(monkeypatch):
+    monkeypatch.setattr(rag, "MULTI_PROCESS_THRESHOLD", 2)
+    monkeypatch.setattr(torch.cuda, "device_count", lambda: 1)
+    model = FakePoolEncoder()
+    SimpleRAG(model).add_documents(list("abc"))
+    assert model.target_devices is None
+    assert model.calls == [["a", "b", "c"]]